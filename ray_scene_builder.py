@@ -12,13 +12,47 @@ bl_info = {
 }
 
 import bpy
+import bmesh
+import contextlib
+import functools
 import json
 import math
 import mathutils as mu
+import os
 from pathlib import Path
+from typing import TYPE_CHECKING, Final
 from bpy.props import (FloatProperty, IntProperty, StringProperty,
-                       PointerProperty, BoolProperty) # Import BoolProperty
+                       PointerProperty, BoolProperty, EnumProperty) # Import BoolProperty
 from bpy.types import Operator, Panel, PropertyGroup, Context, Material, Scene
+if TYPE_CHECKING: import numpy as np # annotations only; the runtime module comes from _np()
+
+
+# ───────────────────────── LAZY OPTIONAL IMPORTS ──────────────────────────
+# Accelerators are imported on first use, not at add-on load, so enabling the add-on stays instant.
+# The optional ones return None when they are not installed.
+
+@functools.lru_cache(maxsize=1)
+def _np():
+    import numpy # Bundled with Blender; only needed once a scene is exported or imported.
+    return numpy
+
+@functools.lru_cache(maxsize=1)
+def _orjson():
+    try: import orjson # Fast JSON backend; Blender's bundled Python does not ship it.
+    except ImportError: return None
+    return orjson
+
+@functools.lru_cache(maxsize=1)
+def _msgspec():
+    try: import msgspec # MessagePack backend for scene.msgpack files.
+    except ImportError: return None
+    return msgspec
+
+@functools.lru_cache(maxsize=1)
+def _numba():
+    try: import numba # JIT for the bulk coordinate conversion.
+    except ImportError: return None
+    return numba
 
 
 # ───────────────────────── CORE TRANSFORMATION LOGIC ──────────────────────────
@@ -29,20 +63,114 @@ CONVERSION_MATRIX_BLENDER_TO_PATHTRACER = mu.Matrix((
     (0, -1, 0, 0),
     (0, 0, 0, 1)
 ))
+# Derived forms of the constant conversion, computed once instead of on every import/export call.
+CONVERSION_QUATERNION_BLENDER_TO_PATHTRACER: Final = CONVERSION_MATRIX_BLENDER_TO_PATHTRACER.to_quaternion()
+CONVERSION_QUATERNION_PATHTRACER_TO_BLENDER: Final = CONVERSION_QUATERNION_BLENDER_TO_PATHTRACER.inverted()
 PATHTRACER_OBJECT_ID_KEY = "rs_type"
-
-def vector_to_list(vector: mu.Vector) -> list[float]:
-    return [vector.x, vector.y, vector.z]
-
-def create_look_at_quaternion(direction: mu.Vector, up: mu.Vector = mu.Vector((0, 1, 0))) -> mu.Quaternion:
+# Shared unit axes; treat as read-only (never modify them in place).
+VEC_X = mu.Vector((1, 0, 0))
+VEC_Y = mu.Vector((0, 1, 0))
+VEC_Z = mu.Vector((0, 0, 1))
+VEC_NEG_Z = mu.Vector((0, 0, -1)) # Blender cameras look down their local -Z.
+SCENE_FILE_SUFFIXES = {'JSON': ".json", 'MSGPACK': ".msgpack", 'NDJSON': ".ndjson"}
+
+def vector_to_xyz(vector: mu.Vector) -> tuple[float, float, float]:
+    # A tuple is cheaper to build and every scene encoder writes it as a JSON/MessagePack array.
+    return (vector.x, vector.y, vector.z)
+
+# The conversion is a pure axis permutation, so these read components directly instead of
+# multiplying by CONVERSION_MATRIX_BLENDER_TO_PATHTRACER (or its inverse).
+def vector_blender_to_pathtracer(vector: mu.Vector) -> mu.Vector:
+    return mu.Vector((vector[0], vector[2], -vector[1]))
+
+def vector_pathtracer_to_blender(vector) -> mu.Vector:
+    return mu.Vector((vector[0], -vector[2], vector[1]))
+
+def matrix_pathtracer_to_blender(matrix: mu.Matrix) -> mu.Matrix:
+    """Same as CONVERSION_MATRIX_BLENDER_TO_PATHTRACER.inverted() @ matrix."""
+    return mu.Matrix((matrix[0], -matrix[2], matrix[1], matrix[3]))
+
+def _bulk_blender_to_pathtracer(coords_in, coords_out):
+    for i in range(coords_in.shape[0]):
+        coords_out[i, 0] = coords_in[i, 0]
+        coords_out[i, 1] = coords_in[i, 2]
+        coords_out[i, 2] = -coords_in[i, 1]
+
+@functools.lru_cache(maxsize=1)
+def _bulk_blender_to_pathtracer_jit():
+    if (numba := _numba()) is None: return None
+    # The first export in a session pays for compilation (or loading the on-disk cache) here. Any failure,
+    # e.g. cache=True raising when the add-on runs from Blender's Text Editor with no source file on disk,
+    # is cached as None so export falls back to the NumPy path instead of failing.
+    try:
+        kernel = numba.njit(cache=True)(_bulk_blender_to_pathtracer); np = _np()
+        for sample in (np.zeros((1, 3), dtype=np.float32), np.zeros((1, 4), dtype=np.float32)[:, :3]): # contiguous and strided inputs
+            kernel(sample, np.empty((1, 3), dtype=np.float32))
+        return kernel
+    except Exception: return None
+
+def blender_to_pathtracer(coords: "np.ndarray") -> "np.ndarray":
+    """Batch version of the Blender -> pathtracer axis swap, (x, y, z) -> (x, z, -y), on an (N, 3) array."""
+    if (kernel := _bulk_blender_to_pathtracer_jit()) is not None:
+        converted = _np().empty((coords.shape[0], 3), dtype=coords.dtype)
+        kernel(coords, converted)
+        return converted
+    coords = coords[:, (0, 2, 1)]
+    coords[:, 2] *= -1
+    return coords
+
+def create_look_at_quaternion(direction: mu.Vector, up: mu.Vector = VEC_Y) -> mu.Quaternion:
     z_axis = -direction.normalized()
+    # Without camera roll (up has no sideways component, and its part perpendicular to z_axis
+    # leans towards world +Z), mathutils' C-side tracker produces the same basis as the manual construction below.
+    if up.z - up.dot(z_axis) * z_axis.z > 0 and abs(z_axis.z) < 0.99999 and abs(up.dot(VEC_Z.cross(z_axis))) < 1e-5:
+        return z_axis.to_track_quat('Z', 'Y')
     if abs(z_axis.dot(up)) > 0.99999:
-        up = mu.Vector((1, 0, 0)) if abs(z_axis.x) < 0.99999 else mu.Vector((0, 1, 0))
+        up = VEC_X if abs(z_axis.x) < 0.99999 else VEC_Y
     x_axis = up.cross(z_axis).normalized()
     y_axis = z_axis.cross(x_axis).normalized()
     return mu.Matrix((x_axis, y_axis, z_axis)).transposed().to_quaternion()
 
 
+# ───────────────────────── SCENE FILE ENCODING ──────────────────────────
+
+def encode_json_record(record: dict) -> bytes:
+    """Compact one-line JSON, used for each line of a .ndjson scene and each record of the compact scene.json stream."""
+    if (orjson := _orjson()) is not None: return orjson.dumps(record, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(record, separators=(',', ':')).encode()
+
+def decode_json_record(raw: bytes):
+    return orjson.loads(raw) if (orjson := _orjson()) is not None else json.loads(raw)
+
+def iter_ndjson_records(scene_file):
+    """Decodes a .ndjson scene lazily, one record per non-blank line; decode errors name the offending line."""
+    for line_number, line in enumerate(scene_file, 1):
+        if not line.strip(): continue
+        try: record = decode_json_record(line)
+        except ValueError as error: raise ValueError(f"line {line_number}: {error}") from error
+        yield record
+
+def write_json_scene_stream(scene_file, header: dict, objects, lights):
+    """Writes a compact scene.json one record at a time instead of encoding the whole document at once."""
+    scene_file.write(encode_json_record(header)[:-1]) # drop the closing brace; the arrays follow
+    for key, records in ((b"objects", objects), (b"lights", lights)):
+        scene_file.write(b',"' + key + b'":[')
+        for i, record in enumerate(records):
+            if i: scene_file.write(b",")
+            scene_file.write(encode_json_record(record))
+        scene_file.write(b"]")
+    scene_file.write(b"}")
+
+@contextlib.contextmanager
+def open_scene_file_atomic(filepath: Path):
+    """Streams into a sibling .tmp file and moves it onto filepath only once writing finished, so a failed export keeps the previous scene."""
+    tmp_path = filepath.with_name(filepath.name + ".tmp")
+    try:
+        with tmp_path.open("wb") as scene_file: yield scene_file
+        os.replace(tmp_path, filepath)
+    finally: tmp_path.unlink(missing_ok=True)
+
+
 # ───────────────────────── PROPERTY DEFINITIONS ──────────────────────────
 
 class PathtracerObjectProperties(PropertyGroup):
@@ -65,6 +193,11 @@ class PathtracerMaterialProperties(PropertyGroup):
 class PathtracerSceneProperties(PropertyGroup):
     samples: IntProperty(name="Samples", min=1, max=65536, default=128)
     aperture: FloatProperty(name="Aperture", min=0, max=1, default=0.01, precision=4)
+    file_format: EnumProperty(name="Format", default='JSON', items=(
+        ('JSON', "JSON", "Human-readable scene.json"),
+        ('MSGPACK', "MessagePack", "Compact binary scene.msgpack (requires the msgspec package)"),
+        ('NDJSON', "JSON Lines", "scene.ndjson with one object or light per line, imported as a stream"),
+    ))
 
 
 # ───────────────────────── PRIMITIVE CREATION OPERATORS ────────────────────────────
@@ -105,79 +238,108 @@ class RS_OT_AddLight(Operator):
 class RS_OT_ExportScene(Operator):
     bl_idname = "rs.export_scene"; bl_label = "Export to scene.json"
     filepath: StringProperty(subtype='FILE_PATH', default="scene.json")
+    pretty: BoolProperty(name="Pretty Print", description="Indent the exported JSON for reading by hand", default=False)
 
     def execute(self, context: Context) -> set:
-        blender_scene = context.scene
-        used_materials = { obj.active_material for obj in blender_scene.objects if PATHTRACER_OBJECT_ID_KEY in obj and obj.active_material }
-        materials_as_json = self._serialize_materials(used_materials)
-        objects_as_json = self._serialize_objects(blender_scene)
-        lights_as_json = self._serialize_lights(blender_scene)
+        blender_scene = context.scene; scene_objects = blender_scene.objects
+        # Walk the scene once and bucket everything the exporter needs.
+        pathtracer_objects = []; pathtracer_indices = []; material_names = []; area_lights = []; light_indices = []; materials_as_json = {}
+        for index, obj in enumerate(scene_objects):
+            if PATHTRACER_OBJECT_ID_KEY in obj:
+                material = obj.active_material
+                if material:
+                    material_name = material.name
+                    pathtracer_objects.append(obj); pathtracer_indices.append(index); material_names.append(material_name)
+                    if material_name not in materials_as_json: materials_as_json[material_name] = self._serialize_material(material)
+            if obj.type == 'LIGHT' and obj.data.type == 'AREA': area_lights.append(obj); light_indices.append(index)
+        np = _np()
+        # Bulk-copy transforms and sizes with foreach_get instead of an RNA round trip per attribute.
+        world_matrices = np.empty(len(scene_objects) * 16, dtype=np.float32); scene_objects.foreach_get("matrix_world", world_matrices)
+        world_matrices = world_matrices.reshape(-1, 4, 4).transpose(0, 2, 1) # RNA stores matrices column-major
+        dimensions = np.empty(len(scene_objects) * 3, dtype=np.float32); scene_objects.foreach_get("dimensions", dimensions)
+        dimensions = dimensions.reshape(-1, 3)
+        # Objects and lights are generators; each writer below pulls one entry at a time.
+        objects_as_json = self._iter_objects(pathtracer_objects, material_names, world_matrices[pathtracer_indices], dimensions[pathtracer_indices])
+        lights_as_json = self._iter_lights(area_lights, world_matrices[light_indices])
         if not blender_scene.camera: self.report({'ERROR'}, "No active camera in the scene."); return {'CANCELLED'}
         camera_as_json = self._serialize_camera(blender_scene.camera, blender_scene.rs_props.aperture)
         render_as_json = self._serialize_render_settings(blender_scene)
-        final_scene_data = { "camera": camera_as_json, "render": render_as_json, "materials": materials_as_json, "objects": objects_as_json, "lights": lights_as_json }
+        header = { "camera": camera_as_json, "render": render_as_json, "materials": materials_as_json }
+        filepath = Path(self.filepath); suffix = filepath.suffix.lower()
         try:
-            with open(self.filepath, "w") as json_file: json.dump(final_scene_data, json_file, indent=4)
+            if suffix == SCENE_FILE_SUFFIXES['MSGPACK']:
+                if (msgspec := _msgspec()) is None: self.report({'ERROR'}, "MessagePack export requires the 'msgspec' package."); return {'CANCELLED'}
+                filepath.write_bytes(msgspec.msgpack.encode({ **header, "objects": list(objects_as_json), "lights": list(lights_as_json) }))
+            elif suffix == SCENE_FILE_SUFFIXES['NDJSON']:
+                # Header line first, then one self-contained record per object and light.
+                with open_scene_file_atomic(filepath) as scene_file:
+                    scene_file.write(encode_json_record(header) + b"\n")
+                    for entry in objects_as_json: scene_file.write(encode_json_record(entry) + b"\n")
+                    for light in lights_as_json: scene_file.write(encode_json_record({"light": light}) + b"\n")
+            elif self.pretty:
+                final_scene_data = { **header, "objects": list(objects_as_json), "lights": list(lights_as_json) }
+                if (orjson := _orjson()) is not None:
+                    filepath.write_bytes(orjson.dumps(final_scene_data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+                else: filepath.write_bytes(json.dumps(final_scene_data, indent=2).encode())
+            else:
+                with open_scene_file_atomic(filepath) as scene_file: write_json_scene_stream(scene_file, header, objects_as_json, lights_as_json)
         except Exception as error: self.report({'ERROR'}, f"Failed to write file: {error}"); return {'CANCELLED'}
         self.report({'INFO'}, f"Scene exported successfully to {self.filepath}"); return {'FINISHED'}
 
-    def invoke(self, context: Context, event): context.window_manager.fileselect_add(self); return {'RUNNING_MODAL'}
-
-    def _serialize_materials(self, materials: set) -> dict:
-        materials_data = {}
-        for material in materials:
-            props = material.rs_props
-            materials_data[material.name] = { "rgb": list(material.diffuse_color)[:3], "metallic": props.metallic, "roughness": props.roughness, "ior": props.ior, "volume_density": props.volume_density, "volume_anisotropy": props.volume_anisotropy }
-        return materials_data
-
-    def _serialize_objects(self, blender_scene: Scene) -> list:
-        objects_data = []
-        for blender_object in blender_scene.objects:
-            if PATHTRACER_OBJECT_ID_KEY not in blender_object or not blender_object.active_material: continue
-            final_transform = CONVERSION_MATRIX_BLENDER_TO_PATHTRACER @ blender_object.matrix_world
-            # --- START: MODIFICATION ---
-            # Also get the object's 'in_focus' property.
-            common_properties = { "name": blender_object.name, "mat": blender_object.active_material.name, "in_focus": blender_object.rs_object_props.in_focus }
-            # --- END: MODIFICATION ---
+    def invoke(self, context: Context, event):
+        self.filepath = str(Path(self.filepath).with_suffix(SCENE_FILE_SUFFIXES[context.scene.rs_props.file_format]))
+        context.window_manager.fileselect_add(self); return {'RUNNING_MODAL'}
+
+    def _serialize_material(self, material: Material) -> dict:
+        props = material.rs_props
+        return { "rgb": material.diffuse_color[:3], "metallic": props.metallic, "roughness": props.roughness, "ior": props.ior, "volume_density": props.volume_density, "volume_anisotropy": props.volume_anisotropy }
+
+    def _iter_objects(self, pathtracer_objects: list, material_names: list, world_matrices: "np.ndarray", dimensions: "np.ndarray"):
+        # Columns of the world matrix are the scaled local axes, so the plane edges are
+        # just the first two columns times the half extents.
+        centers = blender_to_pathtracer(world_matrices[:, :3, 3]).tolist()
+        u_vectors = blender_to_pathtracer(world_matrices[:, :3, 0] * (dimensions[:, 0:1] * 0.5)).tolist()
+        v_vectors = blender_to_pathtracer(world_matrices[:, :3, 1] * (dimensions[:, 1:2] * 0.5)).tolist()
+        radii = (dimensions[:, 0] * 0.5).tolist()
+        for i, blender_object in enumerate(pathtracer_objects):
+            name = blender_object.name; material_name = material_names[i]
+            in_focus = blender_object.rs_object_props.in_focus
             pathtracer_object_type = blender_object[PATHTRACER_OBJECT_ID_KEY]
 
             if pathtracer_object_type == "sphere":
-                center_pathtracer = final_transform.translation
-                radius = blender_object.dimensions.x / 2.0
-                objects_data.append({"sphere": { **common_properties, "center": vector_to_list(center_pathtracer), "radius": radius }})
+                yield {"sphere": { "name": name, "mat": material_name, "in_focus": in_focus, "center": centers[i], "radius": radii[i] }}
             elif pathtracer_object_type == "plane":
-                dims = blender_object.dimensions
-                u_vector = final_transform.to_3x3() @ mu.Vector((dims.x / 2.0, 0, 0))
-                v_vector = final_transform.to_3x3() @ mu.Vector((0, dims.y / 2.0, 0))
-                objects_data.append({"plane": { **common_properties, "point": vector_to_list(final_transform.translation), "u": vector_to_list(u_vector), "v": vector_to_list(v_vector) }})
-        return objects_data
-
-    def _serialize_lights(self, blender_scene: Scene) -> list:
-        # ... (This function remains the same) ...
-        lights_data = []
-        for light_object in blender_scene.objects:
-            if light_object.type != 'LIGHT' or light_object.data.type != 'AREA': continue
-            final_transform = CONVERSION_MATRIX_BLENDER_TO_PATHTRACER @ light_object.matrix_world
-            blender_light_data = light_object.data
-            if blender_light_data.shape == 'SQUARE': width = blender_light_data.size; height = blender_light_data.size
-            else: width = blender_light_data.size; height = blender_light_data.size_y
-            u_vector = final_transform.to_3x3() @ mu.Vector((width * 0.5, 0, 0))
-            v_vector = final_transform.to_3x3() @ mu.Vector((0, height * 0.5, 0))
-            u_vector.negate()
-            lights_data.append({ "pos": vector_to_list(final_transform.translation), "u": vector_to_list(u_vector), "v": vector_to_list(v_vector), "intensity": [blender_light_data.energy] * 3 })
-        if not lights_data: lights_data.append({ "pos": [0, 5, 0], "u": [2, 0, 0], "v": [0, 0, 2], "intensity": [25, 25, 25] })
-        return lights_data
+                yield {"plane": { "name": name, "mat": material_name, "in_focus": in_focus, "point": centers[i], "u": u_vectors[i], "v": v_vectors[i] }}
+
+    def _iter_lights(self, area_lights: list, world_matrices: "np.ndarray"):
+        if not area_lights: yield { "pos": [0, 5, 0], "u": [2, 0, 0], "v": [0, 0, 2], "intensity": [25, 25, 25] }; return
+        np = _np(); half_extents = []; energies = []
+        for light_object in area_lights:
+            blender_light_data = light_object.data; width = blender_light_data.size
+            height = width if blender_light_data.shape == 'SQUARE' else blender_light_data.size_y
+            half_extents.append((-width * 0.5, height * 0.5)) # u points along -X in the pathtracer's light convention
+            energies.append(blender_light_data.energy)
+        half_extents = np.array(half_extents, dtype=np.float32)
+        # Same column trick as for planes, applied to all lights at once.
+        positions = blender_to_pathtracer(world_matrices[:, :3, 3]).tolist()
+        u_vectors = blender_to_pathtracer(world_matrices[:, :3, 0] * half_extents[:, 0:1]).tolist()
+        v_vectors = blender_to_pathtracer(world_matrices[:, :3, 1] * half_extents[:, 1:2]).tolist()
+        rotations = world_matrices[:, :3, :3].tolist()
+        for i, energy in enumerate(energies):
+            # The rotation is stored as well so the importer can restore orientation without rebuilding a basis from u/v.
+            quat = CONVERSION_QUATERNION_BLENDER_TO_PATHTRACER @ mu.Matrix(rotations[i]).to_quaternion()
+            yield { "pos": positions[i], "u": u_vectors[i], "v": v_vectors[i], "intensity": [energy] * 3, "quat": list(quat) }
 
     def _serialize_camera(self, camera_object: bpy.types.Object, aperture: float) -> dict:
-        # ... (This function remains the same) ...
         blender_world_matrix = camera_object.matrix_world
         pos_blender = blender_world_matrix.translation
-        forward_blender = (blender_world_matrix.to_3x3() @ mu.Vector((0, 0, -1))).normalized()
-        up_blender = (blender_world_matrix.to_3x3() @ mu.Vector((0, 1, 0))).normalized()
-        pos_pathtracer = CONVERSION_MATRIX_BLENDER_TO_PATHTRACER @ pos_blender
-        look_at_pathtracer = CONVERSION_MATRIX_BLENDER_TO_PATHTRACER @ (pos_blender + forward_blender)
-        up_pathtracer = (CONVERSION_MATRIX_BLENDER_TO_PATHTRACER.to_3x3() @ up_blender).normalized()
-        return { "pos": vector_to_list(pos_pathtracer), "look_at": vector_to_list(look_at_pathtracer), "up": vector_to_list(up_pathtracer), "fov": math.degrees(camera_object.data.angle), "aperture": aperture }
+        rotation_blender = blender_world_matrix.to_3x3()
+        forward_blender = (rotation_blender @ VEC_NEG_Z).normalized()
+        up_blender = (rotation_blender @ VEC_Y).normalized()
+        pos_pathtracer = vector_blender_to_pathtracer(pos_blender)
+        look_at_pathtracer = vector_blender_to_pathtracer(pos_blender + forward_blender)
+        up_pathtracer = vector_blender_to_pathtracer(up_blender)
+        return { "pos": vector_to_xyz(pos_pathtracer), "look_at": vector_to_xyz(look_at_pathtracer), "up": vector_to_xyz(up_pathtracer), "fov": math.degrees(camera_object.data.angle), "aperture": aperture }
 
     def _serialize_render_settings(self, blender_scene: Scene) -> dict:
         return { "width": blender_scene.render.resolution_x, "height": blender_scene.render.resolution_y, "samples": blender_scene.rs_props.samples }
@@ -190,87 +352,123 @@ class RS_OT_ImportScene(Operator):
     filepath: StringProperty(subtype='FILE_PATH', default="scene.json")
 
     def execute(self, context: Context) -> set:
-        filepath = Path(self.filepath)
+        filepath = Path(self.filepath); suffix = filepath.suffix.lower()
         if not filepath.is_file(): self.report({'ERROR'}, f"File not found: {self.filepath}"); return {'CANCELLED'}
-        with filepath.open('r') as json_file: scene_data = json.load(json_file)
+        if suffix == SCENE_FILE_SUFFIXES['NDJSON']:
+            # Records are decoded and built one line at a time, so the parsed scene is never held in memory as a whole.
+            # The trade-off: a bad line partway through stops the import with the records before it already built.
+            try:
+                with filepath.open('rb') as scene_file:
+                    records = iter_ndjson_records(scene_file)
+                    self._build_scene(context, next(records, {}), records, ())
+            except OSError as error: self.report({'ERROR'}, f"Failed to read file: {error}"); return {'CANCELLED'}
+            except ValueError as error: self.report({'ERROR'}, f"Invalid scene record, import is incomplete: {error}"); return {'CANCELLED'}
+            self.report({'INFO'}, "Scene imported successfully."); return {'FINISHED'}
+        if suffix == SCENE_FILE_SUFFIXES['MSGPACK'] and (msgspec := _msgspec()) is None: self.report({'ERROR'}, "MessagePack import requires the 'msgspec' package."); return {'CANCELLED'}
+        # Both decoders take raw bytes, so the file is never decoded into an intermediate str.
+        try: raw = filepath.read_bytes()
+        except OSError as error: self.report({'ERROR'}, f"Failed to read file: {error}"); return {'CANCELLED'}
+        scene_data = msgspec.msgpack.decode(raw) if suffix == SCENE_FILE_SUFFIXES['MSGPACK'] else decode_json_record(raw)
+        self._build_scene(context, scene_data, scene_data.get("objects", []), scene_data.get("lights", []))
+        self.report({'INFO'}, "Scene imported successfully."); return {'FINISHED'}
+
+    def invoke(self, context: Context, event): context.window_manager.fileselect_add(self); return {'RUNNING_MODAL'}
+
+    def _build_scene(self, context: Context, scene_data: dict, object_entries, light_entries):
         self._clear_scene(context)
         materials_map = self._create_materials(scene_data.get("materials", {}))
-        self._create_objects(context, scene_data.get("objects", []), materials_map)
-        self._create_lights(context, scene_data.get("lights", []))
+        self._create_objects(context, object_entries, materials_map)
+        self._create_lights(context, light_entries)
         self._setup_camera(context, scene_data.get("camera", {}))
         self._setup_render_settings(context, scene_data.get("render", {}), scene_data.get("camera", {}))
-        self.report({'INFO'}, "Scene imported successfully."); return {'FINISHED'}
-
-    def invoke(self, context: Context, event): context.window_manager.fileselect_add(self); return {'RUNNING_MODAL'}
+        context.view_layer.update() # one depsgraph evaluation for everything created above
 
     def _clear_scene(self, context: Context):
-        objects_to_remove = [o for o in bpy.data.objects if PATHTRACER_OBJECT_ID_KEY in o or "RS_" in o.name]
-        for obj in objects_to_remove: bpy.data.objects.remove(obj, do_unlink=True)
-        mats_to_remove = [m for m in bpy.data.materials if hasattr(m, 'rs_props')]
-        for mat in mats_to_remove:
-            if not mat.users: bpy.data.materials.remove(mat)
+        # batch_remove does a single ID-management pass instead of one per removed datablock.
+        objects_to_remove = tuple(o for o in bpy.data.objects if PATHTRACER_OBJECT_ID_KEY in o or "RS_" in o.name)
+        if objects_to_remove: bpy.data.batch_remove(ids=objects_to_remove)
+        mats_to_remove = tuple(m for m in bpy.data.materials if hasattr(m, 'rs_props') and not m.users)
+        if mats_to_remove: bpy.data.batch_remove(ids=mats_to_remove)
 
     def _create_materials(self, materials_json: dict) -> dict:
-        # ... (This function remains the same) ...
-        blender_mats = {}
-        for name, props in materials_json.items():
-            mat = bpy.data.materials.new(name); mat.use_nodes = False
-            mat.diffuse_color = (*props.get("rgb", [1,0,1]), 1.0)
-            mat.rs_props.metallic = props.get("metallic", 0.0); mat.rs_props.roughness = props.get("roughness", 0.5)
-            mat.rs_props.ior = props.get("ior", 1.5); mat.rs_props.volume_density = props.get("volume_density", 0.0)
-            mat.rs_props.volume_anisotropy = props.get("volume_anisotropy", 0.0); blender_mats[name] = mat
+        blender_mats = {}; new_material = bpy.data.materials.new
+        if not materials_json: return blender_mats
+        # All colors go into one float32 RGBA buffer; each row is then assigned directly as a diffuse_color.
+        np = _np(); colors = np.ones((len(materials_json), 4), dtype=np.float32)
+        colors[:, :3] = [props.get("rgb", (1, 0, 1)) for props in materials_json.values()]
+        for color, (name, props) in zip(colors, materials_json.items()):
+            mat = new_material(name); mat.use_nodes = False; rs_props = mat.rs_props; get = props.get
+            mat.diffuse_color = color
+            rs_props.metallic = get("metallic", 0.0); rs_props.roughness = get("roughness", 0.5)
+            rs_props.ior = get("ior", 1.5); rs_props.volume_density = get("volume_density", 0.0)
+            rs_props.volume_anisotropy = get("volume_anisotropy", 0.0); blender_mats[name] = mat
         return blender_mats
 
-    def _create_objects(self, context: Context, objects_json: list, materials_map: dict):
-        CONV_inv = CONVERSION_MATRIX_BLENDER_TO_PATHTRACER.inverted()
-        for entry in objects_json:
-            obj = None; desc = None
-            if "sphere" in entry:
-                desc = entry["sphere"]
-                center_blender = CONV_inv @ mu.Vector(desc.get("center"))
-                bpy.ops.mesh.primitive_uv_sphere_add(radius=desc.get("radius",1), location=center_blender)
-                obj = context.active_object; obj[PATHTRACER_OBJECT_ID_KEY] = "sphere"
-            elif "plane" in entry:
-                desc = entry["plane"]
-                center_pt = mu.Vector(desc.get("point")); u_pt = mu.Vector(desc.get("u")); v_pt = mu.Vector(desc.get("v"))
-                blender_matrix = CONV_inv @ mu.Matrix.Translation(center_pt)
-                blender_matrix @= mu.Matrix.Rotation(u_pt.angle(mu.Vector((1,0,0))), 4, 'X')
-                blender_matrix @= mu.Matrix.Rotation(v_pt.angle(mu.Vector((0,1,0))), 4, 'Y')
-                bpy.ops.mesh.primitive_plane_add(size=1.0)
-                obj = context.active_object
-                obj.matrix_world = blender_matrix
-                obj.dimensions = (u_pt.length * 2, v_pt.length * 2, 0)
-                obj[PATHTRACER_OBJECT_ID_KEY] = "plane"
-            if obj and desc:
-                obj.name = desc.get("name", "ImportedObject")
-                if desc.get("mat") in materials_map: obj.data.materials.append(materials_map[desc.get("mat")])
-                # --- START: MODIFICATION ---
-                # Read the 'in_focus' property from the JSON.
-                obj.rs_object_props.in_focus = desc.get("in_focus", False)
-                # --- END: MODIFICATION ---
-
-    def _create_lights(self, context: Context, lights_json: list):
-        # ... (This function is mostly the same) ...
-        CONV_inv = CONVERSION_MATRIX_BLENDER_TO_PATHTRACER.inverted()
-        for light_data in lights_json:
-            center_pt = mu.Vector(light_data.get("pos")); u_pt = -mu.Vector(light_data.get("u")); v_pt = mu.Vector(light_data.get("v"))
-            blender_matrix = CONV_inv @ mu.Matrix.Translation(center_pt)
-            bpy.ops.object.light_add(type='AREA')
-            obj, light = context.active_object, context.active_object.data
-            obj.name = "RS_ImportedLight"
-            obj.matrix_world = blender_matrix
-            light.shape = 'RECTANGLE'
-            light.size = u_pt.length * 2.0
-            light.size_y = v_pt.length * 2.0
-            light.energy = light_data.get("intensity", [25])[0]
+    def _new_template_mesh(self, name: str, build) -> bpy.types.Mesh:
+        bm = bmesh.new(); build(bm)
+        mesh = bpy.data.meshes.new(name); bm.to_mesh(mesh); bm.free()
+        return mesh
+
+    def _create_objects(self, context: Context, objects_json, materials_map: dict):
+        # Build each primitive once with bmesh instead of running bpy.ops per object (context push,
+        # depsgraph update and undo step every call). Objects get their own copy of the template
+        # because materials are appended to the mesh data.
+        sphere_template = self._new_template_mesh("RS_Sphere", lambda bm: bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=1.0, calc_uvs=True))
+        plane_template = self._new_template_mesh("RS_Plane", lambda bm: bmesh.ops.create_grid(bm, x_segments=1, y_segments=1, size=0.5, calc_uvs=True))
+        try:
+            for entry in objects_json:
+                obj = None; desc = None
+                if "light" in entry: self._create_light(context, entry["light"]) # .ndjson streams interleave light records
+                elif "sphere" in entry:
+                    desc = entry["sphere"]; radius = desc.get("radius", 1)
+                    obj = bpy.data.objects.new(desc.get("name", "ImportedObject"), sphere_template.copy())
+                    obj.location = vector_pathtracer_to_blender(desc.get("center"))
+                    obj.scale = (radius, radius, radius)
+                    obj[PATHTRACER_OBJECT_ID_KEY] = "sphere"
+                elif "plane" in entry:
+                    desc = entry["plane"]
+                    center_pt = mu.Vector(desc.get("point")); u_pt = mu.Vector(desc.get("u")); v_pt = mu.Vector(desc.get("v"))
+                    blender_matrix = matrix_pathtracer_to_blender(mu.Matrix.Translation(center_pt))
+                    blender_matrix @= mu.Matrix.Rotation(u_pt.angle(VEC_X), 4, 'X')
+                    blender_matrix @= mu.Matrix.Rotation(v_pt.angle(VEC_Y), 4, 'Y')
+                    obj = bpy.data.objects.new(desc.get("name", "ImportedObject"), plane_template.copy())
+                    obj.matrix_world = blender_matrix
+                    obj.dimensions = (u_pt.length * 2, v_pt.length * 2, 0)
+                    obj[PATHTRACER_OBJECT_ID_KEY] = "plane"
+                if obj and desc:
+                    context.collection.objects.link(obj)
+                    material = materials_map.get(desc.get("mat"))
+                    if material is not None: obj.data.materials.append(material)
+                    # --- START: MODIFICATION ---
+                    # Read the 'in_focus' property from the JSON.
+                    obj.rs_object_props.in_focus = desc.get("in_focus", False)
+                    # --- END: MODIFICATION ---
+        finally: bpy.data.meshes.remove(sphere_template); bpy.data.meshes.remove(plane_template)
+
+    def _create_lights(self, context: Context, lights_json):
+        for light_data in lights_json: self._create_light(context, light_data)
+
+    def _create_light(self, context: Context, light_data: dict):
+        blender_matrix = matrix_pathtracer_to_blender(mu.Matrix.Translation(light_data.get("pos")))
+        # Data-API creation like the mesh primitives: no per-light operator call, undo step or redraw.
+        light = bpy.data.lights.new("RS_ImportedLight", type='AREA')
+        obj = bpy.data.objects.new("RS_ImportedLight", light)
+        context.collection.objects.link(obj)
+        obj.matrix_world = blender_matrix
+        if "quat" in light_data:
+            obj.rotation_mode = 'QUATERNION'
+            obj.rotation_quaternion = CONVERSION_QUATERNION_PATHTRACER_TO_BLENDER @ mu.Quaternion(light_data["quat"])
+        light.shape = 'RECTANGLE'
+        # u and v are half edges, so the light's full size is twice their length.
+        light.size = math.hypot(*light_data.get("u")) * 2.0
+        light.size_y = math.hypot(*light_data.get("v")) * 2.0
+        light.energy = light_data.get("intensity", [25])[0]
 
     def _setup_camera(self, context: Context, camera_json: dict):
-        # ... (This function remains the same) ...
-        CONV_inv = CONVERSION_MATRIX_BLENDER_TO_PATHTRACER.inverted()
         cam = context.scene.camera;
         if not cam: cam_data = bpy.data.cameras.new("RS_Camera"); cam = bpy.data.objects.new("RS_Camera", cam_data); context.scene.collection.objects.link(cam); context.scene.camera = cam
-        pos = CONV_inv @ mu.Vector(camera_json.get("pos")); look_at = CONV_inv @ mu.Vector(camera_json.get("look_at"))
-        up = (CONV_inv.to_3x3() @ mu.Vector(camera_json.get("up"))).normalized(); cam.location = pos
+        pos = vector_pathtracer_to_blender(camera_json.get("pos")); look_at = vector_pathtracer_to_blender(camera_json.get("look_at"))
+        up = vector_pathtracer_to_blender(camera_json.get("up")).normalized(); cam.location = pos
         cam.rotation_euler = create_look_at_quaternion(look_at - pos, up).to_euler()
         cam.data.angle = math.radians(camera_json.get("fov", 50.0))
 
@@ -307,6 +505,7 @@ class RS_PT_MainPanel(Panel):
             else: col.label(text="Assign a material to see properties", icon='ERROR')
         box = layout.box(); col = box.column(align=True); col.label(text="Render Settings", icon='SCENE_DATA')
         col.prop(context.scene.rs_props, "samples"); col.prop(context.scene.rs_props, "aperture")
+        col.prop(context.scene.rs_props, "file_format")
         layout.separator(); row = layout.row(align=True); row.scale_y = 1.5
         row.operator(RS_OT_ImportScene.bl_idname, text="Import Scene", icon='FILE_FOLDER')
         row.operator(RS_OT_ExportScene.bl_idname, text="Export Scene", icon='EXPORT')
@@ -32,7 +32,15 @@ fn main() {
     let gpu_mode = args.contains(&"--gpu".to_string());
 
     // ── parse JSON ────────────────────────────────────────────────────────
-    let scene = load("scene.json");
+    // An explicit path (first non-flag argument) wins; otherwise fall back to the
+    // other export formats when no scene.json is present.
+    let scene_path = args.iter().skip(1).map(String::as_str).find(|a| !a.starts_with('-'))
+        .or_else(|| ["scene.json", "scene.msgpack", "scene.ndjson"]
+            .into_iter()
+            .find(|p| Path::new(p).exists()))
+        .unwrap_or("scene.json");
+    println!("Loading scene from {scene_path}");
+    let scene = load(scene_path);
 
     let width     = scene.render.width;
     let height    = scene.render.height;
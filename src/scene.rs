@@ -74,6 +74,21 @@ pub struct LightJson {
 }
 
 
+/// First line of a `.ndjson` scene; every following line is a `SceneRecord`.
+#[derive(Deserialize)]
+struct SceneHeader {
+    camera   : CameraJson,
+    render   : RenderJson,
+    materials: HashMap<String, MaterialJson>,
+}
+
+#[derive(Deserialize)]
+#[serde(untagged)]
+enum SceneRecord {
+    Object(ObjectJson),
+    Light { light: LightJson },
+}
+
 #[derive(Deserialize)]
 struct SceneFile {
     camera   : CameraJson,
@@ -91,9 +106,33 @@ pub struct Scene {
     pub lights : Vec<Light>,
 }
 
+fn parse_ndjson(data: &[u8]) -> SceneFile {
+    let mut lines = data
+        .split(|&b| b == b'\n')
+        .filter(|line| !line.iter().all(|b| b.is_ascii_whitespace()));
+    let header: SceneHeader = serde_json::from_slice(lines.next().expect("ndjson header"))
+        .expect("ndjson header parse");
+    let mut objects = Vec::new();
+    let mut lights = Vec::new();
+    for line in lines {
+        match serde_json::from_slice(line).expect("ndjson record parse") {
+            SceneRecord::Object(o) => objects.push(o),
+            SceneRecord::Light { light } => lights.push(light),
+        }
+    }
+    SceneFile { camera: header.camera, render: header.render, materials: header.materials, objects, lights }
+}
+
 pub fn load(path:&str) -> Scene {
-    let data = std::fs::read_to_string(path).expect("scene file");
-    let file : SceneFile = serde_json::from_str(&data).expect("json parse");
+    let data = std::fs::read(path).expect("scene file");
+    // Same schema either way; the Blender add-on can emit both formats.
+    let file : SceneFile = if path.ends_with(".msgpack") {
+        rmp_serde::from_slice(&data).expect("msgpack parse")
+    } else if path.ends_with(".ndjson") {
+        parse_ndjson(&data)
+    } else {
+        serde_json::from_slice(&data).expect("json parse")
+    };
 
     // 1. Create a library of materials from the JSON
     let materials: HashMap<String, Material> = file.materials.into_iter().map(|(name, m)| {